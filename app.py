@@ -19,12 +19,12 @@ if "initialized" not in st.session_state:
     
     st.session_state["session_service"] = InMemorySessionService()
     
-    # Create ADK Session (Sync)
+    # Create ADK Session (create_session is a coroutine in current ADK)
     try:
-        session = st.session_state["session_service"].create_session(
+        session = asyncio.run(st.session_state["session_service"].create_session(
             app_name="agentic-story-studio",
             user_id="default_user"
-        )
+        ))
         st.session_state["session_id"] = session.id
     except Exception as e:
         st.error(f"Failed to create session: {e}")
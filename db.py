@@ -9,6 +9,8 @@ def init_db():
     """Creates the projects table if it doesn't exist."""
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
+    # Must precede table creation; lets maintenance.compact_db() free pages incrementally.
+    c.execute("PRAGMA auto_vacuum = INCREMENTAL")
     c.execute('''
         CREATE TABLE IF NOT EXISTS projects (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,6 +25,8 @@ def init_db():
             storyboard_output TEXT
         )
     ''')
+    # Archival selects cold projects by age
+    c.execute("CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at)")
     conn.commit()
     conn.close()
 
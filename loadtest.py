@@ -0,0 +1,502 @@
+import argparse
+import asyncio
+import gc
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from streamlit import config as st_config
+from streamlit import logger as st_logger
+from streamlit.runtime.runtime import Runtime
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+from config import logger
+import agent
+import db
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# ============================================================
+#  FAKE MODEL BACKEND
+# ============================================================
+
+class FakeLlm(BaseLlm):
+    """Offline stand-in for Gemini: returns a canned reply after a simulated delay."""
+
+    reply: str
+    latency: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=self.reply)])
+        )
+
+
+def install_fake_backend(latency: float, script_kb: int):
+    """Swaps the model of every studio agent for a FakeLlm.
+
+    Only the model is replaced, so the Runner, the session service and the
+    HookedAgent transcript parsing still run exactly as they do in production.
+    """
+    scene = "INT. MARS KITCHEN - NIGHT\n\nROBO-CHEF\nThe souffle rises. So do I.\n\n"
+    replies = [
+        (agent.researcher_agent, "LOGLINE: A robot chef on Mars.\nPROTAGONIST: Robo-Chef.\nTONE: Warm sci-fi."),
+        (agent.writer_agent, scene * max(1, script_kb * 1024 // len(scene))),
+        (agent.editor_agent, '{"approved": true, "score": 8, "critique": "Greenlit."}'),
+        (agent.storyboard_agent, "**Scene 1**\n\n![Storyboard Panel](https://placehold.co/600x300/png?text=Mars)"),
+    ]
+    for hooked, reply in replies:
+        hooked.agent.model = FakeLlm(model=f"fake-{hooked.name}", reply=reply, latency=latency)
+
+
+# ============================================================
+#  METRICS
+# ============================================================
+
+class Metrics:
+    """Thread-safe collector for rerun latencies, DB call times and errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.reruns: Dict[str, List[float]] = {}
+        self.db_calls: Dict[str, List[float]] = {}
+        self.lock_waits: Dict[str, List[float]] = {}
+        self.db_locked = 0
+        self.errors: List[str] = []
+
+    def record_rerun(self, step: str, seconds: float):
+        with self._lock:
+            self.reruns.setdefault(step, []).append(seconds)
+
+    def record_db_call(self, name: str, seconds: float):
+        with self._lock:
+            self.db_calls.setdefault(name, []).append(seconds)
+
+    def record_lock_wait(self, name: str, seconds: float):
+        with self._lock:
+            self.lock_waits.setdefault(name, []).append(seconds)
+
+    def record_db_locked(self):
+        with self._lock:
+            self.db_locked += 1
+
+    def record_error(self, message: str):
+        with self._lock:
+            self.errors.append(message)
+
+
+DB_FUNCTIONS = [
+    "init_db",
+    "create_project",
+    "update_project_field",
+    "update_editor_stats",
+    "get_all_projects",
+    "load_project",
+]
+
+BUSY_TIMEOUT = 5.0  # sqlite3.connect's default
+_lock_wait = threading.local()
+
+
+def _wait_for_lock(operation):
+    """Runs a SQLite operation, retrying while the DB is locked.
+
+    This does in Python what SQLite's busy handler does (back off and retry
+    for up to BUSY_TIMEOUT), so the time spent waiting for a lock can be
+    added to this thread's tally instead of vanishing into the call.
+    """
+    waiting_since = None
+    delay = 0.001
+    try:
+        while True:
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                if "database is locked" not in str(e):
+                    raise
+                if waiting_since is None:
+                    waiting_since = time.perf_counter()
+                elif time.perf_counter() - waiting_since >= BUSY_TIMEOUT:
+                    raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+    finally:
+        if waiting_since is not None:
+            _lock_wait.seconds = getattr(_lock_wait, "seconds", 0.0) + time.perf_counter() - waiting_since
+
+
+class _LockTimingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return _wait_for_lock(lambda: super(_LockTimingCursor, self).execute(sql, parameters))
+
+
+class _LockTimingConnection(sqlite3.Connection):
+    """Connection whose lock waits go through _wait_for_lock."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs["timeout"] = 0  # Fail fast; _wait_for_lock does the (timed) waiting.
+        super().__init__(*args, **kwargs)
+
+    def cursor(self, factory=_LockTimingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        return _wait_for_lock(super().commit)
+
+
+class _LockTimingSqlite:
+    """Stands in for the sqlite3 module inside db.py."""
+
+    def __getattr__(self, name):
+        return getattr(sqlite3, name)
+
+    @staticmethod
+    def connect(*args, **kwargs):
+        return sqlite3.connect(*args, factory=_LockTimingConnection, **kwargs)
+
+
+def instrument_db(metrics: Metrics):
+    """Wraps the public db functions to time every call and its lock waits.
+
+    db.py's connections are swapped for _LockTimingConnection, so the time
+    spent waiting for SQLite locks is recorded separately from the call's
+    total time. A wait past BUSY_TIMEOUT raises "database is locked", as
+    sqlite3's own timeout would, and is counted.
+    """
+    db.sqlite3 = _LockTimingSqlite()
+    for name in DB_FUNCTIONS:
+        original = getattr(db, name)
+
+        @wraps(original)
+        def timed(*args, _original=original, _name=name, **kwargs):
+            _lock_wait.seconds = 0.0
+            start = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if "locked" in str(e):
+                    metrics.record_db_locked()
+                raise
+            finally:
+                metrics.record_db_call(_name, time.perf_counter() - start)
+                if _lock_wait.seconds:
+                    metrics.record_lock_wait(_name, _lock_wait.seconds)
+
+        setattr(db, name, timed)
+
+
+# ============================================================
+#  SIMULATED USERS
+# ============================================================
+
+def share_test_runtime():
+    """Lets many AppTest sessions run at once.
+
+    AppTest installs a mock Runtime singleton and the `global.appTest`
+    option for the duration of each run and resets both afterwards, which
+    pulls them out from under any other session that is mid-run. Pin the
+    option on and fall back to the most recent mock runtime instead.
+    """
+    st_config.set_option("global.appTest", True)
+
+    last = {}
+    original_instance = Runtime.instance.__func__
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        return last.get("runtime") or original_instance(cls)
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in last
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+# Compile errors by id() of the AppTest session state they happened in.
+_compile_errors: Dict[int, BaseException] = {}
+
+
+class _RecordingScriptRunner(LocalScriptRunner):
+    """LocalScriptRunner that keeps the compile errors AppTest would otherwise drop."""
+
+    def __init__(self, script_path, session_state, *args, **kwargs):
+        super().__init__(script_path, session_state, *args, **kwargs)
+
+        def record_compile_error(sender, event, **data):
+            if event == ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR:
+                _compile_errors[id(session_state)] = data.get("exception")
+
+        self.on_event.connect(record_compile_error, weak=False)
+
+
+def record_compile_errors():
+    app_test.LocalScriptRunner = _RecordingScriptRunner
+
+
+def run_failure(at: AppTest) -> Optional[str]:
+    """Why the last rerun failed, or None if it ran cleanly.
+
+    A script that fails to compile produces no elements at all, and
+    `st.error` messages (e.g. "Parser Error") are not exceptions, so check
+    all three.
+    """
+    compile_error = _compile_errors.pop(id(at._session_state), None)
+    if compile_error is not None:
+        return f"script failed to compile: {compile_error!r}"
+    if at.exception:
+        return f"exception: {at.exception[0].value}"
+    if at.error:
+        return f"st.error: {at.error[0].value}"
+    return None
+
+
+# (step name, {text widget label: value}, button label to click)
+FLOW = [
+    ("open", {}, None),
+    ("start_project", {"Enter your Story Idea:": "User {user}: a robot who wants to be a chef on Mars."}, "🚀 Start Project"),
+    ("research", {}, "Run Researcher"),
+    ("write", {"Manager Notes:": "Tighten the second act."}, "✍️ Write Script"),
+    ("review", {}, "🕵️ Run Review"),
+    ("storyboard", {}, "🎨 Generate Storyboards"),
+]
+
+STATE_KEYS = ["user_request", "research_context", "script_content", "editor_feedback", "storyboard_output"]
+
+
+def _find(widgets, label: str):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"widget '{label}' not on page")
+
+
+def simulate_user(user: int, users: int, metrics: Metrics, args) -> AppTest:
+    """Walks session `user` of `users` through the full studio flow, timing every rerun."""
+    if args.ramp_up:
+        time.sleep(args.ramp_up * user / users)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    for step, inputs, button in FLOW:
+        if args.think_time:
+            time.sleep(random.uniform(0, 2 * args.think_time))
+        try:
+            for label, value in inputs.items():
+                _find(at.text_area, label).input(value.format(user=user))
+            if button:
+                _find(at.button, button).click()
+
+            start = time.perf_counter()
+            at.run()
+            metrics.record_rerun(step, time.perf_counter() - start)
+
+            failure = run_failure(at)
+            if failure:
+                metrics.record_error(f"user {user} @ {step}: {failure}")
+                break
+        except Exception as e:
+            metrics.record_error(f"user {user} @ {step}: {e}")
+            break
+    return at
+
+
+def session_payload_bytes(at: AppTest) -> int:
+    """Size of the project text a session keeps in st.session_state."""
+    total = 0
+    for key in STATE_KEYS:
+        if key in at.session_state:
+            total += len(str(at.session_state[key]).encode("utf-8"))
+    return total
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+# ============================================================
+#  REPORTING
+# ============================================================
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def _format_rows(title: str, buckets: Dict[str, List[float]]) -> List[str]:
+    lines = [f"{title:<24}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+    every = [s for samples in buckets.values() for s in samples]
+    for name, samples in list(buckets.items()) + [("ALL", every)]:
+        if not samples:
+            continue
+        p50, p95, p99 = (percentile(samples, p) * 1000 for p in (50, 95, 99))
+        lines.append(
+            f"  {name:<22}{len(samples):>7}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{max(samples) * 1000:>9.1f}"
+        )
+    return lines
+
+
+def print_report(users: int, elapsed: float, metrics: Metrics, rss_delta: int, payload: List[int],
+                 start_projects: int):
+    failed = len(metrics.errors)
+    print(f"\n=== {users} concurrent users: {users - failed} completed, {failed} failed in {elapsed:.1f}s ===")
+    print(f"Starting DB: {start_projects} projects")
+    print("\n".join(_format_rows("Reruns", metrics.reruns)))
+    print("\n".join(_format_rows("DB calls (total time)", metrics.db_calls)))
+    print("\n".join(_format_rows("DB lock waits", metrics.lock_waits)))
+    print(f"  (only calls that had to wait; 'database is locked' errors: {metrics.db_locked})")
+    print(
+        f"Memory: {rss_delta / 2**20:+.1f} MB RSS (~{rss_delta / users / 1024:.0f} KB/session), "
+        f"session_state payload ~{sum(payload) / max(1, len(payload)) / 1024:.1f} KB/session"
+    )
+    for error in metrics.errors[:5]:
+        print(f"  ! {error}")
+    if failed > 5:
+        print(f"  ! ... and {failed - 5} more")
+
+
+# ============================================================
+#  DRIVER
+# ============================================================
+
+def fresh_db(seed: Optional[str]) -> str:
+    """Creates a throwaway DB file, copied from `seed` if given, and returns its path."""
+    fd, path = tempfile.mkstemp(prefix="studio-loadtest-", suffix=".db")
+    os.close(fd)
+    if seed:
+        src, dst = sqlite3.connect(seed), sqlite3.connect(path)
+        src.backup(dst)
+        dst.close()
+        src.close()
+    return path
+
+
+def count_projects() -> int:
+    conn = sqlite3.connect(db.DB_NAME)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0  # No table yet; the first session's init_db() creates it.
+    finally:
+        conn.close()
+
+
+def warm_up(metrics: Metrics, args):
+    """Runs one untimed session on a throwaway DB.
+
+    Lazy imports in ADK, genai and Streamlit, the script bytecode cache and
+    the first Runner all allocate once per process; without this they would
+    land in the first level's memory-per-session figure.
+    """
+    db.DB_NAME = fresh_db(None)
+    try:
+        simulate_user(0, 1, metrics, args)
+        if metrics.errors:
+            print(f"Warm-up session failed: {metrics.errors[0]}")
+    finally:
+        os.remove(db.DB_NAME)
+        metrics.reset()
+
+
+def run_level(users: int, metrics: Metrics, args):
+    """Runs `users` sessions concurrently, one thread each, as Streamlit does.
+
+    Every level gets its own copy of the starting DB, so levels are measured
+    under the same conditions and `--db` itself is never written to.
+    """
+    db.DB_NAME = fresh_db(args.db)
+    try:
+        start_projects = count_projects()
+        metrics.reset()
+        gc.collect()
+        rss_before = _rss_bytes()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            sessions = list(pool.map(lambda u: simulate_user(u, users, metrics, args), range(users)))
+        elapsed = time.perf_counter() - start
+
+        # Measure while every session is still referenced.
+        rss_delta = _rss_bytes() - rss_before
+        payload = [session_payload_bytes(at) for at in sessions]
+        print_report(users, elapsed, metrics, rss_delta, payload, start_projects)
+    finally:
+        os.remove(db.DB_NAME)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Headless multi-user load test for the Streamlit studio.")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50, 100],
+                        help="Concurrent user counts to step through (default: 1 10 50 100).")
+    parser.add_argument("--model-latency", type=float, default=0.0,
+                        help="Mean simulated model latency per agent call, in seconds.")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Mean pause between a user's clicks, in seconds.")
+    parser.add_argument("--ramp-up", type=float, default=0.0,
+                        help="Spread session start times over this many seconds.")
+    parser.add_argument("--script-kb", type=int, default=20,
+                        help="Size of the fake screenplay each session writes, in KB.")
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Per-rerun timeout, in seconds.")
+    parser.add_argument("--db", default=None,
+                        help="SQLite file to start each level from. It is copied, never written to "
+                             "(default: an empty DB).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    # Agent hooks and setup_config log on every session; keep the report readable.
+    logger.setLevel(logging.ERROR)
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    st_config.set_option("logger.level", "error")
+    st_logger.set_log_level("error")
+
+    if args.db and not os.path.exists(args.db):
+        raise SystemExit(f"Database {args.db} not found.")
+
+    metrics = Metrics()
+    install_fake_backend(args.model_latency, args.script_kb)
+    instrument_db(metrics)
+    share_test_runtime()
+    record_compile_errors()
+
+    warm_up(metrics, args)
+    for users in args.users:
+        run_level(users, metrics, args)
+
+
+if __name__ == "__main__":
+    main()
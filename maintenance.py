@@ -0,0 +1,388 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import db
+
+BATCH_SIZE = 500
+# Archive deletes run in small write transactions with a pause in between,
+# long enough for the app's busy-wait retries to grab the lock.
+DELETE_BATCH_SIZE = 50
+DELETE_PAUSE = 0.1
+ARCHIVE_DIR = "archives"
+
+# ============================================================
+#  HELPERS
+# ============================================================
+
+def _connect():
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _columns(conn) -> List[str]:
+    """Column names of the projects table, in table order."""
+    return [row["name"] for row in conn.execute("PRAGMA table_info(projects)")]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet files need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _parquet_schema(conn):
+    pa = _import_pyarrow()
+    return pa.schema([
+        (row["name"], pa.int64() if row["type"].upper() == "INTEGER" else pa.string())
+        for row in conn.execute("PRAGMA table_info(projects)")
+    ])
+
+def _select_in_chunks(conn, where: str, params=()) -> Iterator[sqlite3.Row]:
+    """Yields the projects matching `where` in id order, `BATCH_SIZE` per query.
+
+    Each chunk is a separate keyset query and fetchall() ends it, so no
+    read lock is held while the caller encodes or writes rows. The default
+    rollback journal would otherwise make every app write wait for it.
+    """
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT * FROM projects WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+            (*params, last_id, BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]["id"]
+
+# ============================================================
+#  STREAMING FILE I/O  (.jsonl, .jsonl.gz, .parquet)
+# ============================================================
+
+def _write_rows(path: str, rows: Iterable[Dict], schema=None) -> int:
+    """Streams rows to `path` and returns how many were written.
+
+    The file is written under a temporary name, fsynced and then renamed,
+    so a crash never leaves a truncated archive behind.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    count = 0
+
+    try:
+        if path.endswith(".parquet"):
+            pa = _import_pyarrow()
+            with pa.parquet.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= BATCH_SIZE:
+                        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    count += len(batch)
+        else:
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(tmp_path, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    count += 1
+
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return count
+
+
+def _read_rows(path: str) -> Iterator[Dict]:
+    """Yields rows from a .jsonl, .jsonl.gz or .parquet file without loading it whole."""
+    if path.endswith(".parquet"):
+        pa = _import_pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE):
+            yield from batch.to_pylist()
+    else:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+# ============================================================
+#  MAINTENANCE OPERATIONS
+# ============================================================
+
+def get_db_stats() -> Dict:
+    """Returns project count, file size and free (reclaimable) space."""
+    conn = _connect()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    stats = {
+        "projects": conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0],
+        "size_bytes": conn.execute("PRAGMA page_count").fetchone()[0] * page_size,
+        "free_bytes": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+        "auto_vacuum": ["none", "full", "incremental"][conn.execute("PRAGMA auto_vacuum").fetchone()[0]],
+    }
+    conn.close()
+    return stats
+
+
+def export_projects(path: str, project_ids: Optional[List[int]] = None) -> int:
+    """Streams projects (all, or just `project_ids`) to a file. Returns the row count.
+
+    Rows are read in short chunks rather than one snapshot, so app writes
+    are never blocked; a project edited mid-export is written as it was
+    when its chunk was read.
+    """
+    conn = _connect()
+    where, params = "1", []
+    if project_ids:
+        where = f"id IN ({','.join('?' * len(project_ids))})"
+        params = list(project_ids)
+
+    schema = _parquet_schema(conn) if path.endswith(".parquet") else None
+    try:
+        return _write_rows(path, (dict(row) for row in _select_in_chunks(conn, where, params)), schema)
+    finally:
+        conn.close()
+
+
+def import_projects(path: str, keep_ids: bool = False) -> int:
+    """Bulk-inserts every project in a file in a single transaction.
+
+    New ids are assigned unless `keep_ids` is set (e.g. when restoring an
+    archive); a clashing id then rolls back the whole import.
+    """
+    conn = _connect()
+    columns = _columns(conn)
+    if not keep_ids:
+        columns.remove("id")
+    query = f"INSERT INTO projects ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    try:
+        with conn:
+            cursor = conn.executemany(
+                query, (tuple(row.get(c) for c in columns) for row in _read_rows(path))
+            )
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def _row_digest(row) -> str:
+    """Fingerprint of a project row, used to spot rows edited mid-archive."""
+    return hashlib.sha1(json.dumps(list(row), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def archive_projects(older_than_days: int, path: Optional[str] = None, abandoned_only: bool = False) -> Dict:
+    """Moves cold projects out of the live DB into a compressed archive file.
+
+    A project is cold when it was created more than `older_than_days` ago;
+    with `abandoned_only`, projects that reached the storyboard stage are
+    kept.
+
+    Nothing holds a lock while the archive is built: rows are read in short
+    `BATCH_SIZE` chunks and the file is written and fsynced first. Rows are
+    then deleted `DELETE_BATCH_SIZE` at a time, each chunk in its own short
+    write transaction, and only if the row is unchanged since it was
+    archived. Rows edited in the meantime stay live and are dropped from
+    the archive (reported as `skipped`). If a delete fails partway, the
+    archive is cut down to the rows already deleted before the error is
+    re-raised, so it can always be restored with `import_projects`.
+    """
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+    if path is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(ARCHIVE_DIR, f"projects-{stamp}.jsonl.gz")
+    if os.path.exists(path):
+        raise FileExistsError(f"Archive {path} already exists.")
+
+    where = "created_at < ?"
+    if abandoned_only:
+        where += " AND (storyboard_output IS NULL OR storyboard_output = '')"
+
+    conn = _connect()
+    schema = _parquet_schema(conn) if path.endswith(".parquet") else None
+    digests: Dict[int, str] = {}
+
+    def cold_rows():
+        for row in _select_in_chunks(conn, where, (cutoff,)):
+            digests[row["id"]] = _row_digest(row)
+            yield dict(row)
+
+    try:
+        count = _write_rows(path, cold_rows(), schema)
+        if not count:
+            os.remove(path)
+            return {"archived": 0, "skipped": 0, "path": None}
+
+        ids = list(digests)
+        deleted = set()
+        try:
+            for i in range(0, len(ids), DELETE_BATCH_SIZE):
+                if i:
+                    time.sleep(DELETE_PAUSE)
+                chunk = ids[i:i + DELETE_BATCH_SIZE]
+                conn.execute("BEGIN IMMEDIATE")
+                current = conn.execute(
+                    f"SELECT * FROM projects WHERE {where} AND id IN ({','.join('?' * len(chunk))})",
+                    (cutoff, *chunk),
+                ).fetchall()
+                unchanged = [row["id"] for row in current if _row_digest(row) == digests[row["id"]]]
+                conn.executemany("DELETE FROM projects WHERE id = ?", ((pid,) for pid in unchanged))
+                conn.commit()
+                deleted.update(unchanged)
+        except BaseException:
+            # Earlier chunks are already gone from the DB; the archive must
+            # hold exactly those rows so they can still be restored.
+            if conn.in_transaction:
+                conn.rollback()
+            _trim_archive(path, deleted, count, schema)
+            raise
+    finally:
+        conn.close()
+
+    path = _trim_archive(path, deleted, count, schema)
+    return {"archived": len(deleted), "skipped": count - len(deleted), "path": path}
+
+
+def _trim_archive(path: str, deleted: set, count: int, schema=None) -> Optional[str]:
+    """Drops rows that are still live from an archive of `count` rows.
+
+    Rows still in the DB must not be in the archive, or restoring it would
+    clash. Returns the archive path, or None if nothing was deleted and the
+    file was removed.
+    """
+    if not deleted:
+        os.remove(path)
+        return None
+    if len(deleted) < count:
+        _write_rows(path, (row for row in _read_rows(path) if row["id"] in deleted), schema)
+    return path
+
+
+def compact_db(max_pages: Optional[int] = None) -> Dict:
+    """Returns free pages to the OS and refreshes the query planner statistics.
+
+    Uses incremental vacuum, freeing at most `max_pages` pages per call so
+    the write lock is held briefly. A DB created before incremental
+    auto-vacuum was enabled is converted once with a full VACUUM, which
+    rewrites the whole file under an exclusive lock and ignores `max_pages`.
+    """
+    if max_pages is not None and max_pages < 1:
+        raise ValueError("max_pages must be at least 1 (None frees every free page).")
+    size_before = get_db_stats()["size_bytes"]
+    conn = _connect()
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            # execute() would free a single page per step; executescript() runs it to completion.
+            pages = f"({int(max_pages)})" if max_pages is not None else ""
+            conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return {"size_before": size_before, "size_after": get_db_stats()["size_bytes"]}
+
+# ============================================================
+#  CLI
+# ============================================================
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def _compact(max_pages: Optional[int]):
+    if get_db_stats()["auto_vacuum"] != "incremental":
+        print(
+            "Warning: converting to incremental auto-vacuum with a one-time full VACUUM. "
+            "It locks the whole database until it finishes and ignores --max-pages.",
+            file=sys.stderr,
+        )
+    sizes = compact_db(max_pages)
+    print(f"Compacted: {sizes['size_before']} -> {sizes['size_after']} bytes")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintenance tasks for the studio database.")
+    parser.add_argument("--db", default=None, help=f"SQLite file (default: {db.DB_NAME}).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="Show project count, file size and free space.")
+
+    archive = commands.add_parser("archive", help="Move cold projects into an archive file.")
+    archive.add_argument("--older-than", type=int, required=True, metavar="DAYS")
+    archive.add_argument("--abandoned-only", action="store_true",
+                         help="Only archive projects that never reached the storyboard stage.")
+    archive.add_argument("--out", default=None,
+                         help="Archive path: .jsonl.gz (default) or .parquet.")
+    archive.add_argument("--no-compact", action="store_true", help="Skip compaction afterwards.")
+    archive.add_argument("--max-pages", type=_positive_int, default=None,
+                         help="Free at most this many pages when compacting afterwards.")
+
+    compact = commands.add_parser("compact", help="Incremental VACUUM + ANALYZE.")
+    compact.add_argument("--max-pages", type=_positive_int, default=None,
+                         help="Free at most this many pages, to keep the write lock short.")
+
+    export = commands.add_parser("export", help="Export projects to .jsonl[.gz] or .parquet.")
+    export.add_argument("path")
+    export.add_argument("--ids", type=int, nargs="+", default=None)
+
+    import_ = commands.add_parser("import", help="Import projects from .jsonl[.gz] or .parquet.")
+    import_.add_argument("path")
+    import_.add_argument("--keep-ids", action="store_true",
+                         help="Keep the ids stored in the file (e.g. to restore an archive).")
+
+    args = parser.parse_args(argv)
+    if args.db:
+        db.DB_NAME = args.db
+    # Only an import may create the database; anything else on a missing
+    # file is almost certainly a mistyped --db path.
+    if args.command != "import" and not os.path.exists(db.DB_NAME):
+        parser.error(f"database {db.DB_NAME} not found")
+    if args.command in ("import", "archive", "compact"):
+        db.init_db()
+
+    if args.command == "stats":
+        for key, value in get_db_stats().items():
+            print(f"{key}: {value}")
+    elif args.command == "archive":
+        result = archive_projects(args.older_than, args.out, args.abandoned_only)
+        print(f"Archived {result['archived']} projects" + (f" to {result['path']}" if result["path"] else ""))
+        if result["skipped"]:
+            print(f"Skipped {result['skipped']} projects that changed while archiving; they stay live.")
+        if result["archived"] and not args.no_compact:
+            _compact(args.max_pages)
+    elif args.command == "compact":
+        _compact(args.max_pages)
+    elif args.command == "export":
+        print(f"Exported {export_projects(args.path, args.ids)} projects to {args.path}")
+    elif args.command == "import":
+        print(f"Imported {import_projects(args.path, args.keep_ids)} projects from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
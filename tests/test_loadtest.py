@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("google.adk")
+
+import db
+import loadtest
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    """Instruments db.py against a fresh DB, undoing the patches afterwards."""
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "studio.db"))
+    monkeypatch.setattr(db, "sqlite3", db.sqlite3)
+    for name in loadtest.DB_FUNCTIONS:
+        monkeypatch.setattr(db, name, getattr(db, name))
+    monkeypatch.setattr(loadtest, "BUSY_TIMEOUT", 0.2)
+
+    metrics = loadtest.Metrics()
+    loadtest.instrument_db(metrics)
+    db.init_db()
+    metrics.reset()
+    return metrics
+
+
+def _hold_write_lock():
+    conn = sqlite3.connect(db.DB_NAME, check_same_thread=False)
+    conn.execute("BEGIN EXCLUSIVE")
+    return conn
+
+
+def test_percentile_uses_nearest_rank():
+    samples = [5, 1, 4, 2, 3]
+
+    assert loadtest.percentile(samples, 50) == 3
+    assert loadtest.percentile(samples, 95) == 5
+    assert loadtest.percentile(samples, 0) == 1
+    assert loadtest.percentile([7], 99) == 7
+
+
+def test_uncontended_calls_record_no_lock_wait(metrics):
+    db.create_project("An idea")
+
+    assert len(metrics.db_calls["create_project"]) == 1
+    assert metrics.lock_waits == {}
+    assert metrics.db_locked == 0
+
+
+def test_lock_held_past_the_timeout_counts_as_locked(metrics):
+    holder = _hold_write_lock()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            db.create_project("An idea")
+    finally:
+        holder.rollback()
+        holder.close()
+
+    assert metrics.db_locked == 1
+    assert metrics.lock_waits["create_project"][0] >= 0.2
+
+
+def test_lock_wait_is_measured_separately_from_call_time(metrics):
+    holder = _hold_write_lock()
+    release = threading.Timer(0.1, lambda: (holder.rollback(), holder.close()))
+    release.start()
+
+    db.create_project("An idea")
+    release.join()
+
+    waited = metrics.lock_waits["create_project"][0]
+    assert 0.05 <= waited <= metrics.db_calls["create_project"][0]
+    assert metrics.db_locked == 0
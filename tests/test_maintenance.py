@@ -0,0 +1,170 @@
+import os
+import sqlite3
+
+import pytest
+
+import db
+import maintenance
+
+
+@pytest.fixture
+def studio_db(tmp_path, monkeypatch):
+    """A fresh studio DB with two cold projects and one recent project."""
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "studio.db"))
+    monkeypatch.setattr(maintenance, "DELETE_PAUSE", 0)
+    db.init_db()
+
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.executemany(
+        "INSERT INTO projects (created_at, project_name, script_content, editor_score, is_approved) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2020-01-01 10:00:00", "old draft", "INT. MARS - DAY", 4, 0),
+            ("2020-02-01 10:00:00", "old greenlit", "EXT. MOON - NIGHT", 9, 1),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    db.create_project("A brand new idea")
+    return tmp_path
+
+
+def _rows():
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute("SELECT * FROM projects ORDER BY id")]
+    conn.close()
+    return rows
+
+
+def test_archive_then_restore_round_trips(studio_db):
+    before = _rows()
+    path = str(studio_db / "archive.jsonl.gz")
+
+    result = maintenance.archive_projects(30, path)
+
+    assert result == {"archived": 2, "skipped": 0, "path": path}
+    assert [row["project_name"] for row in _rows()] == ["A brand new idea"]
+    assert list(maintenance._read_rows(path)) == before[:2]
+
+    assert maintenance.import_projects(path, keep_ids=True) == 2
+    assert _rows() == before
+
+
+def test_archive_keeps_rows_edited_while_archiving(studio_db, monkeypatch):
+    path = str(studio_db / "archive.jsonl")
+    write_rows = maintenance._write_rows
+
+    def write_then_edit(*args, **kwargs):
+        count = write_rows(*args, **kwargs)
+        db.update_project_field(1, "script_content", "A late rewrite")
+        return count
+
+    monkeypatch.setattr(maintenance, "_write_rows", write_then_edit)
+    result = maintenance.archive_projects(30, path)
+
+    assert result["archived"] == 1 and result["skipped"] == 1
+    assert [row["id"] for row in _rows()] == [1, 3]
+    assert [row["id"] for row in maintenance._read_rows(path)] == [2]
+
+
+def test_export_does_not_block_writers(studio_db, monkeypatch):
+    path = str(studio_db / "export.jsonl")
+    monkeypatch.setattr(maintenance, "BATCH_SIZE", 1)
+    write_rows = maintenance._write_rows
+
+    def write_while_app_writes(path, rows, schema=None):
+        def rows_then_write():
+            for i, row in enumerate(rows):
+                if i == 1:
+                    # timeout=0: fails at once if the export still holds a read lock.
+                    conn = sqlite3.connect(db.DB_NAME, timeout=0)
+                    conn.execute("UPDATE projects SET editor_score = 10 WHERE id = 3")
+                    conn.commit()
+                    conn.close()
+                yield row
+        return write_rows(path, rows_then_write(), schema)
+
+    monkeypatch.setattr(maintenance, "_write_rows", write_while_app_writes)
+
+    assert maintenance.export_projects(path) == 3
+    assert [row["editor_score"] for row in maintenance._read_rows(path)] == [4, 9, 10]
+
+
+def test_failed_delete_leaves_a_restorable_archive(studio_db, monkeypatch):
+    path = str(studio_db / "archive.jsonl")
+    before = _rows()
+    monkeypatch.setattr(maintenance, "DELETE_BATCH_SIZE", 1)
+
+    class SecondChunkLocked(sqlite3.Connection):
+        begins = 0
+
+        def execute(self, sql, *args):
+            if sql == "BEGIN IMMEDIATE":
+                SecondChunkLocked.begins += 1
+                if SecondChunkLocked.begins == 2:
+                    raise sqlite3.OperationalError("database is locked")
+            return super().execute(sql, *args)
+
+    def connect():
+        conn = sqlite3.connect(db.DB_NAME, factory=SecondChunkLocked)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    monkeypatch.setattr(maintenance, "_connect", connect)
+    with pytest.raises(sqlite3.OperationalError):
+        maintenance.archive_projects(30, path)
+
+    assert [row["id"] for row in _rows()] == [2, 3]
+    assert [row["id"] for row in maintenance._read_rows(path)] == [1]
+
+    assert maintenance.import_projects(path, keep_ids=True) == 1
+    assert _rows() == before
+
+
+def test_empty_archive_removes_its_file(studio_db):
+    path = str(studio_db / "archive.jsonl.gz")
+
+    result = maintenance.archive_projects(100000, path)
+
+    assert result == {"archived": 0, "skipped": 0, "path": None}
+    assert not os.path.exists(path)
+    assert len(_rows()) == 3
+
+
+def test_import_with_clashing_id_rolls_back_everything(studio_db):
+    path = str(studio_db / "export.jsonl")
+    maintenance.export_projects(path)
+    before = _rows()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": 999, "project_name": "would be new"}\n')
+    with pytest.raises(sqlite3.IntegrityError):
+        maintenance.import_projects(path, keep_ids=True)
+
+    assert _rows() == before
+
+
+def test_import_assigns_new_ids_by_default(studio_db):
+    path = str(studio_db / "export.jsonl")
+    maintenance.export_projects(path, [1])
+
+    assert maintenance.import_projects(path) == 1
+    assert _rows()[-1]["id"] == 4
+    assert _rows()[-1]["project_name"] == "old draft"
+
+
+def test_read_only_commands_refuse_a_missing_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", db.DB_NAME)  # main() repoints it at --db
+    missing = str(tmp_path / "typo.db")
+
+    with pytest.raises(SystemExit):
+        maintenance.main(["--db", missing, "stats"])
+    assert not os.path.exists(missing)
+
+
+def test_max_pages_must_be_positive(studio_db):
+    with pytest.raises(SystemExit):
+        maintenance.main(["--db", db.DB_NAME, "compact", "--max-pages", "0"])
+    with pytest.raises(ValueError):
+        maintenance.compact_db(0)